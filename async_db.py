@@ -13,7 +13,7 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步Aiomysql的增删改查封装
-from typing import Any, Dict, List, Union
+from typing import Any, AsyncIterator, Dict, List, Tuple, Union
 
 import aiomysql
 
@@ -35,6 +35,24 @@ class AsyncMysqlDB:
                 data = await cur.fetchall()
                 return data or []
 
+    async def iter_query(self, sql: str, *args: Union[str, int], batch_size: int = 100) -> AsyncIterator[Tuple]:
+        """
+        使用服务端游标流式读取查询结果，逐行返回元组，避免一次性把结果集加载到内存
+        :param sql: 查询的sql
+        :param args: sql中传递动态参数列表
+        :param batch_size: 每次从服务端拉取的行数
+        :return:
+        """
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cur:
+                await cur.execute(sql, args)
+                while True:
+                    rows = await cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+
     async def get_first(self, sql: str, *args: Union[str, int]) -> Union[Dict[str, Any], None]:
         """
         从给定的 SQL 中查询记录，返回的是符合条件的第一个结果
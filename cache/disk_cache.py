@@ -0,0 +1,100 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于SQLite文件的本地磁盘缓存，进程重启后缓存依然有效
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from cache.abs_cache import AbstractCache
+
+
+class DiskCache(AbstractCache):
+
+    def __init__(self, cache_path: str = ".cache.db"):
+        """
+        初始化磁盘缓存
+        :param cache_path: 缓存文件路径
+        :return:
+        """
+        # 允许在asyncio.to_thread等工作线程中使用同一个连接，读写通过锁串行化
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expire_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __del__(self):
+        """
+        析构函数，关闭数据库连接
+        :return:
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        关闭数据库连接，重复调用不会报错
+        :return:
+        """
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值, 并且反序列化
+        :param key:
+        :return:
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value, expire_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, expire_at = row
+            # 如果键已过期，则删除键并返回None
+            if expire_at < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+        return pickle.loads(value)
+
+    def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中, 并且序列化
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        with self._lock:
+            self._conn.execute(
+                "REPLACE INTO cache (key, value, expire_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), time.time() + expire_time),
+            )
+            self._conn.commit()
+
+    def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key
+        :param pattern: 匹配模式
+        :return:
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM cache WHERE key LIKE ? AND expire_at >= ?",
+                (pattern.replace('*', '%'), time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -592,4 +592,18 @@ alter table douyin_aweme_comment add column `like_count` varchar(255) NOT NULL D
 
 alter table xhs_note add column xsec_token varchar(50) default null comment '签名算法';
 alter table douyin_aweme_comment add column `pictures` varchar(500) NOT NULL DEFAULT '' COMMENT '评论图片列表';
-alter table bilibili_video_comment add column `like_count` varchar(255) NOT NULL DEFAULT '0' COMMENT '点赞数';
\ No newline at end of file
+alter table bilibili_video_comment add column `like_count` varchar(255) NOT NULL DEFAULT '0' COMMENT '点赞数';
+
+
+-- ----------------------------
+-- liked_count 为字符串，增加数值影子列和索引，便于按关键词取点赞最高的笔记
+-- ----------------------------
+ALTER TABLE `xhs_note`
+    ADD COLUMN `liked_count_num` BIGINT GENERATED ALWAYS AS (
+        CASE
+            WHEN `liked_count` LIKE '%万%'
+                THEN CAST(CAST(REGEXP_SUBSTR(`liked_count`, '^[0-9.]+') AS DECIMAL(12, 2)) * 10000 AS UNSIGNED)
+            ELSE CAST(REGEXP_SUBSTR(`liked_count`, '^[0-9]+') AS UNSIGNED)
+        END
+    ) STORED COMMENT '笔记点赞数(数值，"1.2万"换算为12000)',
+    ADD INDEX `idx_xhs_note_keyword_liked` (`source_keyword`, `liked_count_num` DESC);
@@ -13,5 +13,5 @@
 # @Time    : 2023/12/2 14:37
 # @Desc    : 脚本模块初始化文件
 
-from .xhs_to_dianping import generate_review
+from .xhs_to_dianping import XhsToDianpingGenerator
 
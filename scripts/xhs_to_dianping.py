@@ -6,72 +6,187 @@
 功能：
 1. 调用小红书爬虫搜索指定关键词
 2. 按点赞数排序爬取100个帖子并存储到MySQL
-3. 使用大模型筛选最佳9个图片
+3. 筛选最佳9个图片
 4. 生成适合大众点评的美食测评文案
+
+图片筛选默认使用启发式方法：帖子已按 source_keyword 过滤保证相关性，点赞数作为质量的近似，
+按点赞数降序并去重取前9张，省去一次大模型调用。设置环境变量 USE_AI_IMAGE_RANKER=1
+后改用大模型在高点赞候选中进一步按画面内容挑选，效果可能更好但会多一次模型往返。
 """
 
 import asyncio
+import hashlib
 import json
 import os
 import sys
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+
+import httpx
+import numpy as np
+import pandas as pd
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
 import db
+from cache.cache_factory import CacheFactory
 from media_platform.xhs import XiaoHongShuCrawler
 from store.xhs.xhs_store_sql import query_content_by_content_id
 from db import AsyncMysqlDB
 from var import media_crawler_db_var
 
-# AI模型相关导入
+# 可选依赖，安装后使用orjson序列化输出结果
 try:
-    import openai
-    HAS_OPENAI = True
+    import orjson
 except ImportError:
-    HAS_OPENAI = False
-    print("Warning: openai package not installed. AI features will use template-based generation.")
+    orjson = None
 
+# AI模型相关导入，缺失时在创建AIModelManager时报错
 try:
-    import requests
-    HAS_REQUESTS = True
+    import openai
 except ImportError:
-    HAS_REQUESTS = False
-    print("Warning: requests package not installed. Local AI model support disabled.")
+    openai = None
+
+# 查询关键词下点赞数最高的帖子，参数为 (source_keyword, limit)
+# liked_count_num 是 liked_count 的数值影子列，配合 (source_keyword, liked_count_num) 索引走范围扫描
+TOP_POSTS_SQL = """
+SELECT title, `desc`, liked_count_num, image_list, note_url
+FROM xhs_note
+WHERE source_keyword = %s
+AND liked_count_num > 0
+AND image_list <> ''
+ORDER BY liked_count_num DESC
+LIMIT %s
+"""
+
+# 模板文案的关键词提取规则
+TEMPLATE_KEYWORD_SETS = {
+    '口味佳': frozenset(['好吃', '美味', '香', '嫩', '鲜']),
+    '环境好': frozenset(['环境', '装修', '氛围', '店面']),
+    '服务好': frozenset(['服务', '态度', '热情']),
+    '性价比高': frozenset(['划算', '便宜', '实惠', '性价比']),
+}
+# 所有关键词合并成一个正则，模块加载时编译一次，每段文本只扫描一遍
+_TEMPLATE_WORD_LABELS = {word: label for label, words in TEMPLATE_KEYWORD_SETS.items() for word in words}
+_TEMPLATE_WORD_PATTERN = re.compile('|'.join(sorted(_TEMPLATE_WORD_LABELS, key=len, reverse=True)))
+
+
+def _extract_template_keywords(text: str) -> List[str]:
+    """单次扫描文本，按 TEMPLATE_KEYWORD_SETS 的顺序返回命中的标签"""
+    labels = {_TEMPLATE_WORD_LABELS[word] for word in _TEMPLATE_WORD_PATTERN.findall(text)}
+    return [label for label in TEMPLATE_KEYWORD_SETS if label in labels]
+
+
+@contextmanager
+def _patched_config(**overrides: Any) -> Iterator[None]:
+    """临时覆盖config模块中的配置项，退出时（包括异常退出）恢复原值"""
+    saved = {key: getattr(config, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            setattr(config, key, value)
+
+
+def _rank_unique_indices(liked_counts: np.ndarray, url_codes: np.ndarray, limit: int) -> np.ndarray:
+    """
+    按点赞数降序排列并按URL去重，返回前limit个候选的下标
+    只处理数值数组，URL事先通过pd.factorize转换为整数编码
+    
+    Args:
+        liked_counts: 点赞数数组
+        url_codes: URL对应的整数编码，相同URL编码相同
+        limit: 返回数量
+        
+    Returns:
+        候选下标数组
+    """
+    order = np.argsort(-liked_counts, kind='stable')
+    # 稳定排序后每个URL第一次出现的位置就是点赞数最高的那条记录
+    _, first_positions = np.unique(url_codes[order], return_index=True)
+    return order[np.sort(first_positions)][:limit]
 
 
 @dataclass
-class RestaurantPost:
-    """餐厅帖子数据类"""
-    note_id: str
-    title: str
-    desc: str
-    liked_count: int
-    comment_count: int
-    collected_count: int
-    image_list: List[str]
-    note_url: str
-    nickname: str
+class RestaurantPosts:
+    """餐厅帖子数据类，按列存储，便于直接转成DataFrame做向量化处理"""
+    titles: List[str] = field(default_factory=list)
+    descs: List[str] = field(default_factory=list)
+    liked_counts: List[int] = field(default_factory=list)
+    image_lists: List[List[str]] = field(default_factory=list)
+    note_urls: List[str] = field(default_factory=list)
+    _dataframe: Optional[pd.DataFrame] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __len__(self) -> int:
+        return len(self.titles)
+    
+    def append(self, title: str, desc: str, liked_count: int, image_list: List[str], note_url: str) -> None:
+        """追加一个帖子"""
+        self.titles.append(title)
+        self.descs.append(desc)
+        self.liked_counts.append(liked_count)
+        self.image_lists.append(image_list)
+        self.note_urls.append(note_url)
+        self._dataframe = None
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为DataFrame，结果会被缓存直到再次追加数据"""
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame({
+                'title': self.titles,
+                'desc': self.descs,
+                'liked_count': pd.Series(self.liked_counts, dtype='int64'),
+                'image_list': self.image_lists,
+                'note_url': self.note_urls,
+            })
+        return self._dataframe
 
 
 class AIModelManager:
     """AI模型管理器"""
     
     def __init__(self):
+        if openai is None:
+            raise ImportError('未安装openai库，请先执行: pip install "openai>=1.0"')
+        
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.openai_base_url = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
-        self.local_model_url = os.getenv('LOCAL_MODEL_URL', 'http://localhost:11434/api/generate')
+        if self.openai_api_key:
+            self.base_url = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+            self.model_name = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        else:
+            # 未配置OpenAI时使用本地llama-server提供的OpenAI兼容接口，与远程模型走同一条调用路径
+            self.openai_api_key = 'sk-noop'
+            self.base_url = os.getenv('LOCAL_MODEL_BASE_URL', 'http://localhost:8080/v1')
+            self.model_name = os.getenv('LOCAL_MODEL_NAME', 'qwen2.5-3b-instruct-q4_k_m')
+        self.openai_stream = os.getenv('OPENAI_STREAM', '').lower() in ('1', 'true', 'yes')
+        # 长时间保持空闲连接，同一进程内的模型调用复用连接，不再重复建连
+        self._http_client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=300),
+        )
+        # 复用同一个客户端的连接池，避免每次请求重新建立TCP/TLS连接
+        self._openai_client = openai.AsyncOpenAI(
+            api_key=self.openai_api_key, base_url=self.base_url, http_client=self._http_client
+        )
         
-        if self.openai_api_key and HAS_OPENAI:
-            openai.api_key = self.openai_api_key
-            openai.base_url = self.openai_base_url
+        # 以提示词哈希为键的磁盘缓存，重复运行相同关键词时直接复用AI结果
+        self.cache_expire = int(os.getenv('AI_CACHE_EXPIRE', 86400 * 7))
+        self._response_cache = None
+        if self.cache_expire > 0:
+            self._response_cache = CacheFactory.create_cache('disk', cache_path=os.getenv('AI_CACHE_PATH', '.ai_cache.db'))
     
-    async def analyze_images_content(self, image_candidates: List[Dict], keyword: str, num_images: int = 9) -> List[str]:
-        """使用AI分析图片内容并筛选最佳图片"""
+    async def analyze_images_content(self, image_candidates: pd.DataFrame, keyword: str, num_images: int = 9) -> List[str]:
+        """使用AI分析图片内容并筛选最佳图片，image_candidates 每行一张图片，包含 url/post_title/liked_count 列"""
+        
+        # 先按点赞数预筛选，只把少量候选交给AI，并让AI返回序号而不是URL
+        shortlist = self._prerank_image_candidates(image_candidates, 15)
         
         # 构建提示词
         prompt = f"""
@@ -85,26 +200,32 @@ class AIModelManager:
         5. 图片来源帖子的点赞数较高
 
         候选图片信息：
-        {self._format_image_candidates_for_ai(image_candidates[:30])}
+        {self._format_image_candidates_for_ai(shortlist)}
 
-        请直接返回筛选出的图片URL列表，每行一个URL，不需要其他解释。
+        请只返回JSON，格式为{{"indices": [序号1, 序号2, ...]}}，不需要其他解释。
         """
         
-        try:
-            if self.openai_api_key and HAS_OPENAI:
-                response = await self._call_openai(prompt)
-            else:
-                response = await self._call_local_model(prompt)
-            
-            # 解析AI返回的URL列表
-            urls = [line.strip() for line in response.split('\n') if line.strip() and line.strip().startswith('http')]
+        def parse_urls(response: str) -> List[str]:
+            # 解析AI返回的序号列表，再从候选列表中取回对应的URL
+            indices = json.loads(response).get('indices', [])
+            urls = []
+            for index in indices:
+                if isinstance(index, int) and 1 <= index <= len(shortlist):
+                    url = shortlist[index - 1]['url']
+                    if url not in urls:
+                        urls.append(url)
+            if not urls:
+                raise ValueError(f"AI未返回有效的图片序号: {response}")
             return urls[:num_images]
+        
+        try:
+            return await self._dispatch(prompt, json_mode=True, parse=parse_urls)
             
         except Exception as e:
             logging.warning(f"AI图片筛选失败，使用启发式方法: {e}")
             return await self._heuristic_image_selection(image_candidates, num_images)
     
-    async def generate_dianping_content(self, reference_posts: List[Dict], keyword: str, selected_images: List[str]) -> str:
+    async def generate_dianping_content(self, reference_posts: List[Dict], keyword: str, image_count: int) -> str:
         """使用AI生成大众点评风格的文案"""
         
         prompt = f"""
@@ -120,16 +241,13 @@ class AIModelManager:
         参考信息（来自小红书高点赞帖子）：
         {self._format_posts_for_ai(reference_posts[:10])}
 
-        已筛选的图片数量：{len(selected_images)}张精美图片
+        已筛选的图片数量：{image_count}张精美图片
 
         请生成一篇完整的大众点评风格测评，包含标题和正文：
         """
         
         try:
-            if self.openai_api_key and HAS_OPENAI:
-                response = await self._call_openai(prompt)
-            else:
-                response = await self._call_local_model(prompt)
+            response = await self._dispatch(prompt)
             
             return response.strip()
             
@@ -137,52 +255,73 @@ class AIModelManager:
             logging.warning(f"AI文案生成失败，使用模板方法: {e}")
             return await self._generate_template_content(reference_posts, keyword)
     
-    async def _call_openai(self, prompt: str) -> str:
-        """调用OpenAI API"""
+    async def _dispatch(self, prompt: str, json_mode: bool = False, parse: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        调用模型，并读写磁盘缓存
+        
+        Args:
+            prompt: 提示词
+            json_mode: 是否要求模型返回JSON
+            parse: 解析并校验模型响应，校验失败时抛出异常，只有校验通过的响应才会写入缓存
+            
+        Returns:
+            parse的返回值，未传parse时返回原始响应
+        """
+        if parse is None:
+            parse = lambda response: response
+        cache_key = hashlib.sha256(f"{self.model_name}|{json_mode}|{prompt}".encode('utf-8')).hexdigest()
+        
+        # sqlite读写放到线程池中执行，避免阻塞事件循环
+        if self._response_cache is not None:
+            cached = await asyncio.to_thread(self._response_cache.get, cache_key)
+            if cached is not None:
+                return parse(cached)
+        
+        response = await self._call_openai(prompt, json_mode=json_mode)
+        result = parse(response)
+        
+        if self._response_cache is not None and response:
+            await asyncio.to_thread(self._response_cache.set, cache_key, response, self.cache_expire)
+        return result
+    
+    async def _call_openai(self, prompt: str, json_mode: bool = False) -> str:
+        """调用OpenAI兼容接口（OpenAI或本地llama-server）"""
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
+            extra_kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+            response = await self._openai_client.chat.completions.create(
+                model=self.model_name,
                 messages=[
                     {"role": "system", "content": "你是一个专业的美食内容创作者和图片分析师。"},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=1000,
-                temperature=0.7
+                temperature=0.7,
+                stream=self.openai_stream,
+                **extra_kwargs
             )
-            return response.choices[0].message.content
+            if not self.openai_stream:
+                return response.choices[0].message.content or ''
+            
+            # 流式返回时边接收边拼接，网络传输与模型生成重叠进行
+            chunks = []
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+            return ''.join(chunks)
         except Exception as e:
             raise Exception(f"OpenAI API调用失败: {e}")
     
-    async def _call_local_model(self, prompt: str) -> str:
-        """调用本地模型API（如Ollama）"""
-        if not HAS_REQUESTS:
-            raise Exception("requests库未安装，无法调用本地模型")
-        
-        try:
-            payload = {
-                "model": os.getenv('LOCAL_MODEL_NAME', 'llama2'),
-                "prompt": prompt,
-                "stream": False
-            }
-            
-            response = requests.post(self.local_model_url, json=payload, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result.get('response', '')
-            
-        except Exception as e:
-            raise Exception(f"本地模型调用失败: {e}")
+    async def aclose(self) -> None:
+        """关闭OpenAI客户端共用的HTTP连接池和AI结果缓存"""
+        await self._http_client.aclose()
+        if self._response_cache is not None:
+            self._response_cache.close()
     
     def _format_image_candidates_for_ai(self, candidates: List[Dict]) -> str:
         """格式化图片候选信息供AI分析"""
         formatted = []
         for i, candidate in enumerate(candidates, 1):
-            formatted.append(f"{i}. URL: {candidate['url']}")
-            formatted.append(f"   帖子标题: {candidate['post_title']}")
-            formatted.append(f"   点赞数: {candidate['liked_count']}")
-            formatted.append(f"   描述片段: {candidate['post_desc'][:100]}...")
-            formatted.append("")
+            formatted.append(f"{i}: liked={candidate['liked_count']}, title={candidate['post_title'][:40]}")
         return "\n".join(formatted)
     
     def _format_posts_for_ai(self, posts: List[Dict]) -> str:
@@ -190,28 +329,24 @@ class AIModelManager:
         formatted = []
         for i, post in enumerate(posts, 1):
             formatted.append(f"{i}. 标题: {post['title']}")
-            formatted.append(f"   描述: {post['desc'][:200]}...")
+            formatted.append(f"   描述: {post['desc'][:120]}...")
             formatted.append(f"   点赞数: {post['liked_count']}")
             formatted.append("")
         return "\n".join(formatted)
     
-    async def _heuristic_image_selection(self, candidates: List[Dict], num_images: int) -> List[str]:
-        """启发式图片筛选（AI调用失败时的后备方案）"""
-        candidates.sort(key=lambda x: x['liked_count'], reverse=True)
-        
-        selected = []
-        seen_urls = set()
-        
-        for candidate in candidates:
-            if len(selected) >= num_images:
-                break
-                
-            url = candidate['url']
-            if url not in seen_urls and url.strip():
-                selected.append(url)
-                seen_urls.add(url)
-        
-        return selected[:num_images]
+    def _prerank_image_candidates(self, candidates: pd.DataFrame, limit: int) -> List[Dict]:
+        """按点赞数降序排列并按URL去重，只把前limit个候选转换为字典"""
+        if candidates.empty:
+            return []
+        
+        df = candidates[candidates['url'].str.strip().astype(bool)]
+        url_codes, _ = pd.factorize(df['url'])
+        indices = _rank_unique_indices(df['liked_count'].to_numpy(dtype=np.int64), url_codes, limit)
+        return df.iloc[indices].to_dict('records')
+    
+    async def _heuristic_image_selection(self, candidates: pd.DataFrame, num_images: int) -> List[str]:
+        """启发式图片筛选：按点赞数排序去重，是默认的筛选方式，也是AI调用失败时的后备方案"""
+        return [candidate['url'] for candidate in self._prerank_image_candidates(candidates, num_images)]
     
     async def _generate_template_content(self, reference_posts: List[Dict], keyword: str) -> str:
         """基于模板生成文案（AI调用失败时的后备方案）"""
@@ -222,16 +357,9 @@ class AIModelManager:
             title = post.get('title', '')
             
             # 提取口味、环境、服务相关的关键词
-            text = f"{title} {desc}".lower()
+            text = f"{title} {desc}"
             
-            if any(word in text for word in ['好吃', '美味', '香', '嫩', '鲜']):
-                keywords_found.append('口味佳')
-            if any(word in text for word in ['环境', '装修', '氛围', '店面']):
-                keywords_found.append('环境好')
-            if any(word in text for word in ['服务', '态度', '热情']):
-                keywords_found.append('服务好')
-            if any(word in text for word in ['划算', '便宜', '实惠', '性价比']):
-                keywords_found.append('性价比高')
+            keywords_found.extend(_extract_template_keywords(text))
         
         # 生成标题
         title = f"探店{keyword} | 这家店真的绝了！📸✨"
@@ -265,7 +393,7 @@ class XhsToDianpingGenerator:
     
     def __init__(self, keyword: str):
         self.keyword = keyword
-        self.posts: List[RestaurantPost] = []
+        self.posts = RestaurantPosts()
         self.selected_images: List[str] = []
         self.generated_content: str = ""
         self.ai_manager = AIModelManager()
@@ -283,44 +411,33 @@ class XhsToDianpingGenerator:
         """
         self.logger.info(f"开始爬取小红书关键词: {self.keyword}")
         
-        # 临时修改配置
-        original_keywords = config.KEYWORDS
-        original_sort_type = config.SORT_TYPE
-        original_max_notes = config.CRAWLER_MAX_NOTES_COUNT
-        original_save_option = config.SAVE_DATA_OPTION
-        
         try:
-            # 设置爬虫配置
-            config.KEYWORDS = self.keyword
-            config.SORT_TYPE = "popularity_descending"  # 按点赞数降序
-            config.CRAWLER_MAX_NOTES_COUNT = max_posts
-            config.SAVE_DATA_OPTION = "db"  # 保存到数据库
-            config.CRAWLER_TYPE = "search"
-            config.ENABLE_GET_IMAGES = True  # 启用图片爬取
-            config.ENABLE_GET_COMMENTS = False  # 不需要评论，提高效率
-            
-            # 初始化数据库
-            await db.init_db()
-            
-            # 创建爬虫实例
-            crawler = XiaoHongShuCrawler()
-            
-            # 开始爬取
-            await crawler.start()
+            # 临时修改爬虫配置，退出时恢复全部被修改的配置项
+            with _patched_config(
+                KEYWORDS=self.keyword,
+                SORT_TYPE="popularity_descending",  # 按点赞数降序
+                CRAWLER_MAX_NOTES_COUNT=max_posts,
+                SAVE_DATA_OPTION="db",  # 保存到数据库
+                CRAWLER_TYPE="search",
+                ENABLE_GET_IMAGES=True,  # 启用图片爬取
+                ENABLE_GET_COMMENTS=False,  # 不需要评论，提高效率
+            ):
+                # 初始化数据库
+                await db.init_db()
+                
+                # 创建爬虫实例
+                crawler = XiaoHongShuCrawler()
+                
+                # 开始爬取
+                await crawler.start()
             
             self.logger.info(f"完成爬取，开始从数据库获取数据")
             
         except Exception as e:
             self.logger.error(f"爬虫执行出错: {e}")
             raise
-        finally:
-            # 恢复原始配置
-            config.KEYWORDS = original_keywords
-            config.SORT_TYPE = original_sort_type
-            config.CRAWLER_MAX_NOTES_COUNT = original_max_notes
-            config.SAVE_DATA_OPTION = original_save_option
     
-    async def get_top_posts_from_db(self, limit: int = 100) -> List[RestaurantPost]:
+    async def get_top_posts_from_db(self, limit: int = 100) -> RestaurantPosts:
         """
         从数据库获取点赞最高的帖子
         
@@ -334,49 +451,21 @@ class XhsToDianpingGenerator:
         
         async_db_conn: AsyncMysqlDB = media_crawler_db_var.get()
         
-        # 查询点赞数最高的帖子，按点赞数降序排列
-        sql = f"""
-        SELECT note_id, title, `desc`, liked_count, comment_count, collected_count, 
-               image_list, note_url, nickname
-        FROM xhs_note 
-        WHERE source_keyword = '{self.keyword}'
-        AND liked_count IS NOT NULL 
-        AND liked_count != ''
-        AND image_list IS NOT NULL
-        AND image_list != ''
-        ORDER BY CAST(liked_count AS UNSIGNED) DESC
-        LIMIT {limit}
-        """
-        
         try:
-            rows = await async_db_conn.query(sql)
-            posts = []
+            posts = RestaurantPosts()
             
-            for row in rows:
-                # 处理图片列表
-                image_list = []
-                if row.get('image_list'):
-                    image_list = [img.strip() for img in row['image_list'].split(',') if img.strip()]
+            # 只查询下游用到的列，并通过服务端游标按元组流式读取
+            async for title, desc, liked_count, image_list_str, note_url in async_db_conn.iter_query(TOP_POSTS_SQL, self.keyword, limit):
+                # 处理图片列表，入库时由 ','.join(urls) 生成，不含空白，只需过滤空串
+                image_list = [img for img in image_list_str.split(',') if img] if image_list_str else []
                 
-                # 转换点赞数为整数
-                liked_count = 0
-                try:
-                    liked_count = int(row.get('liked_count', 0) or 0)
-                except (ValueError, TypeError):
-                    liked_count = 0
-                
-                post = RestaurantPost(
-                    note_id=row['note_id'],
-                    title=row.get('title', ''),
-                    desc=row.get('desc', ''),
-                    liked_count=liked_count,
-                    comment_count=int(row.get('comment_count', 0) or 0),
-                    collected_count=int(row.get('collected_count', 0) or 0),
+                posts.append(
+                    title=title or '',
+                    desc=desc or '',
+                    liked_count=int(liked_count or 0),
                     image_list=image_list,
-                    note_url=row.get('note_url', ''),
-                    nickname=row.get('nickname', '')
+                    note_url=note_url or ''
                 )
-                posts.append(post)
             
             self.logger.info(f"获取到 {len(posts)} 个帖子")
             self.posts = posts
@@ -388,7 +477,10 @@ class XhsToDianpingGenerator:
     
     async def select_best_images_with_ai(self, num_images: int = 9) -> List[str]:
         """
-        使用AI筛选最佳图片
+        筛选最佳图片
+        
+        默认按点赞数启发式筛选，不调用模型；设置 USE_AI_IMAGE_RANKER=1 时改用AI模型排序，
+        AI调用失败时仍回退到启发式筛选。
         
         Args:
             num_images: 需要筛选的图片数量
@@ -396,34 +488,41 @@ class XhsToDianpingGenerator:
         Returns:
             筛选出的图片URL列表
         """
-        self.logger.info(f"使用AI筛选最佳 {num_images} 张图片")
-        
-        # 收集所有图片URL和对应的帖子信息
-        image_candidates = []
-        for post in self.posts[:50]:  # 只考虑前50个高点赞帖子
-            for img_url in post.image_list:
-                image_candidates.append({
-                    'url': img_url,
-                    'post_title': post.title,
-                    'post_desc': post.desc,
-                    'liked_count': post.liked_count,
-                    'post_url': post.note_url
-                })
-        
-        # 使用AI模型筛选图片
-        selected_images = await self.ai_manager.analyze_images_content(
-            image_candidates, self.keyword, num_images
+        use_ai_ranker = os.getenv('USE_AI_IMAGE_RANKER', '').lower() in ('1', 'true', 'yes')
+        if use_ai_ranker:
+            self.logger.info(f"使用AI模型筛选最佳 {num_images} 张图片")
+        else:
+            self.logger.info(f"按点赞数启发式筛选最佳 {num_images} 张图片（未设置USE_AI_IMAGE_RANKER）")
+        
+        # 只考虑前50个高点赞帖子，用explode把图片列表展开成一行一张图片，只保留筛选用到的列
+        df = self.posts.to_dataframe().head(50)
+        image_candidates = (
+            df[['image_list', 'title', 'liked_count']]
+            .explode('image_list')
+            .dropna(subset=['image_list'])
+            .rename(columns={'image_list': 'url', 'title': 'post_title'})
         )
         
+        if use_ai_ranker:
+            # 使用AI模型筛选图片
+            selected_images = await self.ai_manager.analyze_images_content(
+                image_candidates, self.keyword, num_images
+            )
+        else:
+            selected_images = await self.ai_manager._heuristic_image_selection(image_candidates, num_images)
+        
         self.selected_images = selected_images
         self.logger.info(f"筛选完成，选出 {len(selected_images)} 张图片")
         
         return selected_images
     
-    async def generate_dianping_content_with_ai(self) -> str:
+    async def generate_dianping_content_with_ai(self, image_count: int = 9) -> str:
         """
         使用AI生成大众点评风格的文案
         
+        Args:
+            image_count: 配图数量，文案只用到数量，不依赖图片筛选结果
+            
         Returns:
             生成的文案内容
         """
@@ -431,16 +530,15 @@ class XhsToDianpingGenerator:
         
         # 收集帖子内容用于参考
         reference_content = []
-        for post in self.posts[:20]:  # 取前20个高质量帖子作为参考
-            reference_content.append({
-                'title': post.title,
-                'desc': post.desc,
-                'liked_count': post.liked_count
-            })
+        if self.posts:
+            # 取前5个描述不重复的高点赞帖子作为参考，控制提示词长度
+            df = self.posts.to_dataframe()
+            df = df[~df['desc'].str[:64].duplicated()].head(5)
+            reference_content = df[['title', 'desc', 'liked_count']].to_dict('records')
         
         # 使用AI生成文案
         content = await self.ai_manager.generate_dianping_content(
-            reference_content, self.keyword, self.selected_images
+            reference_content, self.keyword, image_count
         )
         
         self.generated_content = content
@@ -465,24 +563,21 @@ class XhsToDianpingGenerator:
             if not posts:
                 raise ValueError("未获取到任何帖子数据")
             
-            # 3. 筛选最佳图片
-            images = await self.select_best_images_with_ai(9)
+            # 图片筛选、文案参考和结果输出共用同一份缓存的DataFrame投影
+            posts_df = posts.to_dataframe()
             
-            # 4. 生成文案
-            content = await self.generate_dianping_content_with_ai()
+            # 3. 筛选最佳图片 & 4. 生成文案，两者互不依赖，并发执行
+            images, content = await asyncio.gather(
+                self.select_best_images_with_ai(9),
+                self.generate_dianping_content_with_ai(9)
+            )
             
             result = {
                 'keyword': self.keyword,
                 'total_posts': len(posts),
                 'selected_images': images,
                 'content': content,
-                'top_posts': [
-                    {
-                        'title': post.title,
-                        'liked_count': post.liked_count,
-                        'note_url': post.note_url
-                    } for post in posts[:10]
-                ]
+                'top_posts': posts_df.head(10)[['title', 'liked_count', 'note_url']].to_dict('records')
             }
             
             self.logger.info("任务完成！")
@@ -492,7 +587,8 @@ class XhsToDianpingGenerator:
             self.logger.error(f"任务执行失败: {e}")
             raise
         finally:
-            # 关闭数据库连接
+            # 关闭AI模型HTTP客户端和数据库连接
+            await self.ai_manager.aclose()
             await db.close()
 
 
@@ -535,8 +631,12 @@ async def main():
         
         # 保存结果到文件
         output_file = f"output_{keyword.replace(' ', '_')}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
         
         print(f"\n结果已保存到: {output_file}")
         
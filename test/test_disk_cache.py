@@ -0,0 +1,75 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from cache.disk_cache import DiskCache
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, 'cache.db')
+        self.cache = DiskCache(cache_path=self.cache_path)
+
+    def test_set_and_get(self):
+        self.cache.set('key', {'value': [1, 2, 3]}, 10)
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2, 3]})
+
+    def test_expired_key(self):
+        self.cache.set('key', 'value', 1)
+        time.sleep(2)  # wait for the key to expire
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_persist_across_instances(self):
+        self.cache.set('key', 'value', 10)
+        del self.cache
+        self.cache = DiskCache(cache_path=self.cache_path)
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_keys(self):
+        self.cache.set('ai:1', 'a', 10)
+        self.cache.set('ai:2', 'b', 10)
+        self.cache.set('other', 'c', 10)
+        self.assertEqual(sorted(self.cache.keys('ai:*')), ['ai:1', 'ai:2'])
+
+    def test_access_from_worker_threads(self):
+        async def run():
+            await asyncio.gather(*[
+                asyncio.to_thread(self.cache.set, f'key{i}', i, 10) for i in range(10)
+            ])
+            return await asyncio.gather(*[
+                asyncio.to_thread(self.cache.get, f'key{i}') for i in range(10)
+            ])
+
+        self.assertEqual(asyncio.run(run()), list(range(10)))
+
+    def test_close(self):
+        self.cache.set('key', 'value', 10)
+        self.cache.close()
+        self.cache.close()  # closing twice is a no-op
+        self.cache = DiskCache(cache_path=self.cache_path)
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def tearDown(self):
+        del self.cache
+        self.cache_dir.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import config
+from scripts.xhs_to_dianping import (
+    AIModelManager,
+    _extract_template_keywords,
+    _patched_config,
+    _rank_unique_indices,
+)
+
+
+class TestPatchedConfig(unittest.TestCase):
+
+    def setUp(self):
+        # 使用独立的哨兵对象作为覆盖值，保证与原值不同，漏恢复的配置项一定会被发现
+        self.overrides = {key: object() for key in [
+            'KEYWORDS',
+            'SORT_TYPE',
+            'CRAWLER_MAX_NOTES_COUNT',
+            'SAVE_DATA_OPTION',
+            'CRAWLER_TYPE',
+            'ENABLE_GET_IMAGES',
+            'ENABLE_GET_COMMENTS',
+        ]}
+        self.original = {key: getattr(config, key) for key in self.overrides}
+
+    def test_restore_after_normal_exit(self):
+        with _patched_config(**self.overrides):
+            for key, value in self.overrides.items():
+                self.assertIs(getattr(config, key), value)
+        for key, value in self.original.items():
+            self.assertIs(getattr(config, key), value)
+
+    def test_restore_after_exception(self):
+        with self.assertRaises(RuntimeError):
+            with _patched_config(**self.overrides):
+                raise RuntimeError('crawler failed')
+        for key, value in self.original.items():
+            self.assertIs(getattr(config, key), value)
+
+    def tearDown(self):
+        for key, value in self.original.items():
+            setattr(config, key, value)
+
+
+class TestRankUniqueIndices(unittest.TestCase):
+
+    def test_keep_highest_liked_row_per_url(self):
+        liked_counts = np.array([5, 10, 3, 8])
+        url_codes = np.array([0, 1, 0, 0])
+        self.assertEqual(_rank_unique_indices(liked_counts, url_codes, 10).tolist(), [1, 3])
+
+    def test_stable_order_for_equal_likes(self):
+        liked_counts = np.array([5, 10, 10, 3, 10, 7])
+        url_codes = np.array([0, 1, 0, 2, 3, 1])
+        self.assertEqual(_rank_unique_indices(liked_counts, url_codes, 10).tolist(), [1, 2, 4, 3])
+
+    def test_limit(self):
+        liked_counts = np.array([1, 2, 3, 4])
+        url_codes = np.array([0, 1, 2, 3])
+        self.assertEqual(_rank_unique_indices(liked_counts, url_codes, 2).tolist(), [3, 2])
+
+    def test_empty(self):
+        result = _rank_unique_indices(np.array([], dtype=np.int64), np.array([], dtype=np.int64), 9)
+        self.assertEqual(result.tolist(), [])
+
+
+class TestExtractTemplateKeywords(unittest.TestCase):
+
+    @staticmethod
+    def _legacy_extract(text):
+        # 改为单次扫描之前的逐个 any(...) 实现
+        keywords_found = []
+        if any(word in text for word in ['好吃', '美味', '香', '嫩', '鲜']):
+            keywords_found.append('口味佳')
+        if any(word in text for word in ['环境', '装修', '氛围', '店面']):
+            keywords_found.append('环境好')
+        if any(word in text for word in ['服务', '态度', '热情']):
+            keywords_found.append('服务好')
+        if any(word in text for word in ['划算', '便宜', '实惠', '性价比']):
+            keywords_found.append('性价比高')
+        return keywords_found
+
+    def test_label_order(self):
+        text = '性价比很高，服务热情，店面装修有氛围，肉很嫩'
+        self.assertEqual(_extract_template_keywords(text), ['口味佳', '环境好', '服务好', '性价比高'])
+
+    def test_match_legacy_scan(self):
+        texts = [
+            '',
+            '香喷喷的烤肉',
+            '新鲜的食材，价格实惠',
+            '服务态度一般',
+            '环境不错但是不便宜',
+            '普通的一家店',
+        ]
+        for text in texts:
+            self.assertEqual(_extract_template_keywords(text), self._legacy_extract(text), text)
+
+
+class TestAIResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        env = {'AI_CACHE_PATH': os.path.join(self.cache_dir.name, 'ai_cache.db'), 'AI_CACHE_EXPIRE': '60'}
+        with mock.patch.dict(os.environ, env):
+            self.manager = AIModelManager()
+        self.candidates = pd.DataFrame({
+            'url': ['https://img/a.jpg', 'https://img/b.jpg', 'https://img/c.jpg'],
+            'post_title': ['a', 'b', 'c'],
+            'liked_count': [300, 200, 100],
+        })
+        self.prompts = []
+
+        async def fake_call_openai(prompt, json_mode=False):
+            self.prompts.append(prompt)
+            return self.reply
+
+        self.manager._call_openai = fake_call_openai
+
+    def analyze(self):
+        return asyncio.run(self.manager.analyze_images_content(self.candidates, '烤肉', 1))
+
+    def test_invalid_reply_not_cached(self):
+        self.reply = '{"indices": [99]}'
+        # 序号越界时回退到启发式筛选，且无效回复不写入缓存
+        self.assertEqual(self.analyze(), ['https://img/a.jpg'])
+        self.assertEqual(self.manager._response_cache.keys('*'), [])
+        self.assertEqual(self.analyze(), ['https://img/a.jpg'])
+        self.assertEqual(len(self.prompts), 2)
+
+    def test_valid_reply_served_from_cache(self):
+        self.reply = '{"indices": [2]}'
+        self.assertEqual(self.analyze(), ['https://img/b.jpg'])
+        self.assertEqual(self.analyze(), ['https://img/b.jpg'])
+        self.assertEqual(len(self.prompts), 1)
+
+    def tearDown(self):
+        asyncio.run(self.manager.aclose())
+        self.cache_dir.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()